@@ -2,146 +2,668 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import hashlib
+import heapq
+import itertools
 import json
+import os
 import re
+import shutil
 import subprocess  # noqa: S404
+import sys
+from collections import Counter
 from collections import defaultdict
+from collections.abc import Generator
 from collections.abc import Iterable
 from collections.abc import Iterator
+from concurrent.futures import as_completed
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
 from pathlib import Path
+from typing import Any
+from typing import TYPE_CHECKING
 
-import rich.console
-import rich.progress
-import rich.table
-import rich.traceback
+# Rich is imported lazily, where it is used, to keep startup fast.
+if TYPE_CHECKING:
+    import rich.console
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+else:
+    HAS_ORJSON = True
 
 APP_NAME = "git-culpa"
 TOTALS = "null"
 
 
 def getcache() -> Path:
-    """Return the path to the cache file."""
-    return Path(f".{APP_NAME}.json")
+    """Return the path to the cache directory."""
+    return Path(f".{APP_NAME}.d")
+
+
+def getcontributions() -> Path:
+    """Return the path to the cached contributions."""
+    return getcache() / "contributions.json"
+
+
+def getblame(blob: str) -> Path:
+    """Return the path to the cached blames for a blob."""
+    return getcache() / "blobs" / f"{blob}.json"
+
+
+def _read_json(path: Path) -> Any:
+    """Read JSON from a file, using orjson if available."""
+    data = path.read_bytes()
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def _write_json(path: Path, data: Any) -> None:
+    """Write JSON to a file, using orjson if available."""
+    if HAS_ORJSON:
+        path.write_bytes(orjson.dumps(data))
+    else:
+        path.write_text(json.dumps(data))
+
+
+def _stream(args: list[str]) -> Generator[bytes, None, None]:
+    """Run the command, yielding its output line by line."""
+    with subprocess.Popen(args, stdout=subprocess.PIPE) as process:  # noqa: S603
+        assert process.stdout is not None  # noqa: S101
+        yield from process.stdout
+
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args)
+
+
+# Match only the records we need: group headers, authors, and group ends.
+BLAME_RECORD = re.compile(rb"(?:([0-9a-f]{40}) \d+ \d+ (\d+)|author (.*)|filename .*)$")
 
 
-def _parse_blame_incremental(text: str) -> Iterator[str]:
+def _parse_blame_incremental(output: Iterable[bytes]) -> Iterator[str]:
     """Yield the author of each line."""
-    authors = {}
-    sha = ""
-    for line in text.splitlines():
-        tag, _, payload = line.partition(" ")
-        if len(tag) == 40:
-            sha = tag
+    authors: dict[bytes, str] = {}
+    sha = b""
+    count = 0
+    for line in output:
+        if (match := BLAME_RECORD.match(line)) is None:
+            continue
+
+        header, lines, author = match.groups()
+        if header is not None:
+            sha, count = header, int(lines)
+        elif author is not None:
+            authors[sha] = author.decode(errors="replace")
         elif sha:
-            if tag == "author":
-                authors[sha] = payload
-            if tag == "filename":
-                yield authors[sha]
+            yield from itertools.repeat(authors[sha], count)
 
 
-def dump(*, exclude: str | None) -> None:
-    """Dump contributions."""
-    console = rich.console.Console(stderr=True)
+def _count_lines(authors: Iterable[str]) -> dict[str, int]:
+    """Return the number of lines per author."""
+    return dict(Counter(authors))
+
+
+def _blame(filename: str) -> dict[str, int]:
+    """Return the number of lines per author in the file."""
+    output = _stream(["git", "blame", "--incremental", "--", filename])
+    return _count_lines(_parse_blame_incremental(output))
+
+
+# Cached blames for a blob, keyed by path. Each entry holds the history of
+# the file when it was blamed, and the lines per author.
+Blames = dict[str, dict[str, Any]]
+
+
+def _load_blames(blob: str) -> Blames:
+    """Load the blames for a blob from the cache."""
+    cache = getblame(blob)
+    return _read_json(cache) if cache.is_file() else {}
+
+
+def _save_blames(blob: str, blames: Blames) -> None:
+    """Store the blames for a blob in the cache."""
+    cache = getblame(blob)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    _write_json(cache, blames)
+
+
+def _load_blame(blames: Blames, filename: str, history: str) -> dict[str, int] | None:
+    """Load the blame for a file, unless its history has changed."""
+    entry = blames.get(filename, {})
+    return entry["counts"] if entry.get("history") == history else None
+
+
+def _load_cached_blames(
+    files: dict[str, str | None], blames: dict[str, Blames], histories: dict[str, str]
+) -> dict[str, dict[str, int]]:
+    """Return the cached blame of each file whose history has not changed."""
+
+    def _() -> Iterator[tuple[str, dict[str, int] | None]]:
+        for filename, blob in files.items():
+            if blob is not None:
+                history = histories.get(filename, "")
+                yield filename, _load_blame(blames[blob], filename, history)
+
+    return {filename: counts for filename, counts in _() if counts is not None}
+
+
+def _hash_mailmap() -> str:
+    """Return a digest of the mailmap, which determines the author names."""
+    process = subprocess.run(  # noqa: S603, S607
+        ["git", "rev-parse", "--show-toplevel"],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+    )
+    path = Path(process.stdout.rstrip("\n")) / ".mailmap"
+    if not path.is_file():
+        return ""
+
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+
+def _get_history(filename: str, mailmap: str) -> str:
+    """Return the history of a file, for use as a cache key.
+
+    The history is the last commit that touched the file, combined with the
+    mailmap. Reverts, rebases, and amended authors all change the blame of a
+    file without changing its blob, but they do change its last commit.
+    """
+    process = subprocess.run(  # noqa: S603, S607
+        ["git", "log", "-1", "--full-history", "--no-merges", "--format=%H"]
+        + ["HEAD", "--", filename],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+    )
+    return f"{process.stdout.rstrip()} {mailmap}"
+
+
+def _list_histories(filenames: Iterable[str], mailmap: str) -> dict[str, str]:
+    """Return the history of each file, like `_get_history`.
+
+    The histories are collected in a single pass over the commit log, which
+    stops once every file has been seen.
+    """
+    if not (remaining := set(filenames)):
+        return {}
+
+    histories = {}
+    commit = ""
+    args = ["git", "log", "--relative", "--no-merges", "--format=%x00%H"]
+    args += ["--name-only", "HEAD"]
+
+    with contextlib.closing(_stream([*args, "--"])) as output:
+        for line in output:
+            if not remaining:
+                break
+
+            if line.startswith(b"\0"):
+                commit = line[1:].decode().rstrip("\n")
+            elif (filename := line.decode().rstrip("\n")) in remaining:
+                remaining.remove(filename)
+                histories[filename] = f"{commit} {mailmap}"
+
+    return histories
+
+
+def _blame_files(
+    files: dict[str, str | None], *, console: rich.console.Console
+) -> Iterator[tuple[str, dict[str, int]]]:
+    """Blame the files, yielding the lines per author for each file.
+
+    Files are looked up in the cache by their blob and history, if they have
+    a blob. The remaining files are blamed concurrently. Files often share a
+    blob, so the cache for each blob is read once and written once.
+    """
+    mailmap = _hash_mailmap()
+    blobs = {blob for blob in files.values() if blob is not None}
+    blames = {blob: _load_blames(blob) for blob in blobs}
+
+    # Only cached files need their history up front, to validate the cache.
+    histories = _list_histories(
+        (
+            filename
+            for filename, blob in files.items()
+            if blob is not None and filename in blames[blob]
+        ),
+        mailmap,
+    )
+    cached = _load_cached_blames(files, blames, histories)
+    yield from cached.items()
+
+    filenames = [filename for filename in files if filename not in cached]
+    pending = Counter(
+        blob for filename in filenames if (blob := files[filename]) is not None
+    )
+
+    max_workers = min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        lookups = {}
+        for filename in filenames:
+            futures[executor.submit(_blame, filename)] = filename
+            if files[filename] is not None and filename not in histories:
+                lookups[filename] = executor.submit(_get_history, filename, mailmap)
+
+        completed: Iterable[Future[dict[str, int]]] = as_completed(futures)
+
+        if sys.stderr.isatty():
+            import rich.progress
+
+            completed = rich.progress.track(
+                completed, total=len(futures), console=console
+            )
+
+        try:
+            for future in completed:
+                filename, counts = futures[future], future.result()
+                if (blob := files[filename]) is not None:
+                    history = histories.get(filename) or lookups[filename].result()
+                    blames[blob][filename] = {"history": history, "counts": counts}
+                    pending[blob] -= 1
+                    if not pending[blob]:
+                        _save_blames(blob, blames[blob])
+                yield filename, counts
+        except BaseException:
+            # Fail fast instead of waiting for the queued blames to run.
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _list_files(*, exclude: str | None) -> dict[str, str | None]:
+    """Return the files in the index, mapped to their blob.
+
+    Files that differ from ``HEAD`` are mapped to None, because their blame
+    contains uncommitted lines.
+    """
     options = ["--", f":(exclude){exclude}"] if exclude else []
     process = subprocess.run(  # noqa: S603, S607
-        ["git", "ls-files", *options],
+        ["git", "ls-files", "--stage", *options],
         check=True,
         text=True,
         stdout=subprocess.PIPE,
     )
+    entries = process.stdout.splitlines()
+
+    process = subprocess.run(  # noqa: S603, S607
+        ["git", "diff", "--name-only", "--no-renames", "--relative", "HEAD", *options],
+        check=True,
+        text=True,
+        stdout=subprocess.PIPE,
+    )
+    modified = set(process.stdout.splitlines())
+
+    def _() -> Iterator[tuple[str, str | None]]:
+        for entry in entries:
+            info, _, filename = entry.partition("\t")
+            _, blob, _ = info.split()
+            yield filename, blob if filename not in modified else None
+
+    return dict(_())
+
+
+# Lines per (path, author), flattened to avoid a nested lookup per update.
+Contributions = Counter[tuple[str, str]]
+
+
+def _add_contributions(
+    contributions: Contributions, filename: str, counts: dict[str, int]
+) -> None:
+    """Count the lines of each author towards the file and its directories.
+
+    The counts are grouped by author, so the cost is proportional to the
+    authors of the file rather than its lines.
+    """
+    # Files share directories, so intern them to make key comparisons cheap.
+    parts = filename.split("/")
+    prefixes = tuple(
+        sys.intern("/".join(parts[:index])) for index in range(len(parts) + 1)
+    )
+    contributions.update(
+        {
+            (prefix, author): lines
+            for prefix in prefixes
+            for author, lines in counts.items()
+        }
+    )
+
 
-    filenames = process.stdout.splitlines()
-    contributions: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+def _save_contributions(contributions: Contributions) -> None:
+    """Write contributions to the cache, nested by path and author."""
+    data: dict[str, dict[str, int]] = defaultdict(dict)
+    for (prefix, author), lines in contributions.items():
+        data[prefix][author] = lines
 
-    for filename in rich.progress.track(filenames, console=console):
-        parts = filename.split("/")
-        prefixes = ["/".join(parts[:index]) for index in range(len(parts) + 1)]
-        process = subprocess.run(  # noqa: S603, S607
-            ["git", "blame", "--incremental", "--", filename],
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
+    # Derive the totals once, rather than counting them with every line.
+    for blame in data.values():
+        blame[TOTALS] = sum(
+            lines for author, lines in blame.items() if author != TOTALS
         )
-        for author in _parse_blame_incremental(process.stdout):
-            for prefix in prefixes:
-                contributions[prefix][author] += 1
-                contributions[prefix][TOTALS] += 1
 
-    with getcache().open(mode="w") as io:
-        json.dump(contributions, io)
+    cache = getcontributions()
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    _write_json(cache, data)
+
+
+def dump(*, exclude: str | None) -> None:
+    """Dump contributions."""
+    import rich.console
+
+    console = rich.console.Console(stderr=True)
+    files = _list_files(exclude=exclude)
+    contributions: Contributions = Counter()
+
+    for filename, counts in _blame_files(files, console=console):
+        _add_contributions(contributions, filename, counts)
+
+    _save_contributions(contributions)
+
+
+@dataclass
+class _Change:
+    """A change to a file in the commit log."""
+
+    author: str
+    merge: bool
+    old: str | None = None
+    new: str | None = None
+    binary: bool = False
+    hunks: list[tuple[int, int, int]] = field(default_factory=list)
+
+
+def _parse_diff_path(line: str, prefix: str) -> str | None:
+    """Parse the path from a `---` or `+++` line.
+
+    Git appends a tab to paths containing spaces, and quotes paths containing
+    special characters. Quoted paths are kept quoted, as in `git ls-files`.
+    """
+    path = line[4:].removesuffix("\t")
+    if path == "/dev/null":
+        return None
+
+    if path.startswith('"'):
+        return '"' + path[1:].removeprefix(prefix)
+
+    return path.removeprefix(prefix)
+
+
+def _parse_hunk_header(line: str) -> tuple[int, int, int]:
+    """Parse a hunk header into start, removed lines, and added lines."""
+    # @@ -start[,count] +start[,count] @@
+    _, old, new, *_ = line.split(" ")
+    start, _, removed = old[1:].partition(",")
+    _, _, added = new[1:].partition(",")
+    return int(start), int(removed or "1"), int(added or "1")
+
+
+def _parse_change_header(change: _Change, line: str) -> None:
+    """Update the change from a line in the extended diff header."""
+    if line.startswith("diff --git "):
+        # Ambiguous for paths with spaces; later header lines refine this.
+        path = line.removeprefix("diff --git a/").partition(" b/")[0]
+        change.old = change.new = path
+    elif line.startswith("new file mode"):
+        change.old = None
+    elif line.startswith("deleted file mode"):
+        change.new = None
+    elif line.startswith("rename from "):
+        change.old = line.removeprefix("rename from ")
+    elif line.startswith("rename to "):
+        change.new = line.removeprefix("rename to ")
+    elif line.startswith("--- "):
+        change.old = _parse_diff_path(line, "a/")
+    elif line.startswith("+++ "):
+        change.new = _parse_diff_path(line, "b/")
+    elif line.startswith("Binary files "):
+        change.binary = True
+
+
+def _parse_log(output: Iterable[str]) -> Iterator[_Change]:
+    """Yield the changes to each file, in chronological order."""
+    author, merge = "", False
+    change: _Change | None = None
+    for line in output:
+        if line.startswith("\0"):
+            _, parents, author = line.split("\0", 2)
+            merge = " " in parents
+        elif line.startswith("diff --git "):
+            if change is not None:
+                yield change
+            change = _Change(author, merge)
+            _parse_change_header(change, line)
+        elif change is None or line.startswith(("+", "-", "\\")) and change.hunks:
+            continue
+        elif line.startswith("@@ "):
+            change.hunks.append(_parse_hunk_header(line))
+        else:
+            _parse_change_header(change, line)
+
+    if change is not None:
+        yield change
+
+
+def _apply_hunks(
+    lines: list[str], hunks: list[tuple[int, int, int]], author: str
+) -> list[str]:
+    """Attribute the lines added by the hunks to the author."""
+    result: list[str] = []
+    pos = 0
+    for start, removed, added in hunks:
+        # Pure insertions are placed after the given line, not at it.
+        if removed:
+            start -= 1
+        result += lines[pos:start]
+        result += [author] * added
+        pos = start + removed
+    result += lines[pos:]
+    return result
+
+
+def _replay_changes(
+    changes: Iterable[_Change], files: dict[str, list[str]], dirty: set[str]
+) -> None:
+    """Reconstruct the author of each line by replaying the changes.
+
+    Files whose lines cannot be attributed by replaying the diffs, because they
+    are binary or were changed by a merge, are added to ``dirty``. So are files
+    whose previous path is unknown, in case it was parsed incorrectly.
+    """
+    for change in changes:
+        lines = []
+        if change.old is not None:
+            if change.old not in files:
+                dirty.add(change.old)
+            lines = files.pop(change.old, [])
+
+        if change.old in dirty:
+            dirty.remove(change.old)
+            if change.new is not None:
+                dirty.add(change.new)
+
+        if change.new is not None:
+            files[change.new] = _apply_hunks(lines, change.hunks, change.author)
+            if change.binary or change.merge:
+                dirty.add(change.new)
+
+
+def _replay_log(files: dict[str, list[str]], dirty: set[str]) -> None:
+    """Reconstruct the author of each line by replaying the commit log."""
+    output = _stream(
+        [
+            "git",
+            "log",
+            "--reverse",
+            "--root",
+            "--first-parent",
+            "-m",
+            "-M",
+            "--patch",
+            "--unified=0",
+            "--no-ext-diff",
+            "--no-textconv",
+            "--format=%x00%P%x00%aN",
+        ]
+    )
+
+    # Split on newlines only, as file contents may contain other line breaks.
+    text = (line.decode(errors="replace").removesuffix("\n") for line in output)
+
+    _replay_changes(_parse_log(text), files, dirty)
+
+
+def dump_via_log(*, exclude: str | None) -> None:
+    """Dump contributions, using the commit log instead of blaming every file.
+
+    Only files that cannot be attributed from the commit log are blamed.
+    """
+    import rich.console
+
+    console = rich.console.Console(stderr=True)
+    files = _list_files(exclude=exclude)
+    contributions: Contributions = Counter()
+    lines: dict[str, list[str]] = {}
+    dirty: set[str] = set()
+
+    with console.status("Reading commit log…"):
+        _replay_log(lines, dirty)
+
+    blames = {}
+    for filename, blob in files.items():
+        if blob is None or filename in dirty or filename not in lines:
+            blames[filename] = blob
+        else:
+            counts = _count_lines(lines[filename])
+            _add_contributions(contributions, filename, counts)
+
+    for filename, counts in _blame_files(blames, console=console):
+        _add_contributions(contributions, filename, counts)
+
+    _save_contributions(contributions)
+
+
+GLOB_CHARACTERS = "*?["
 
 
-def _compile_glob_character_class(pattern: str, pos: int) -> tuple[str, int]:
-    start, end = pos, len(pattern)
+@dataclass(frozen=True)
+class LiteralPattern:
+    """A pathspec without glob characters."""
 
-    if pos < end and pattern[pos] == "!":
-        pos += 1
+    path: str
 
-    if pos < end and pattern[pos] == "]":
-        pos += 1
+    def match(self, path: str) -> bool:
+        """Return True if the path is the pathspec."""
+        return path == self.path
 
-    while pos < end and pattern[pos] != "]":
-        pos += 1
 
-    if pos >= end:
-        return r"\[", start
+@dataclass(frozen=True)
+class GlobPattern:
+    """A pathspec with glob characters."""
 
-    cclass = pattern[start:pos].replace("\\", "\\\\")
-    pos += 1
+    prefix: str
+    regex: re.Pattern[str]
 
-    if cclass[0] == "!":
-        cclass = "^" + cclass[1:]
-    elif cclass[0] == "^":
-        cclass = "\\" + cclass
+    def match(self, path: str) -> bool:
+        """Return True if the path matches the pathspec."""
+        return path.startswith(self.prefix) and self.regex.match(path) is not None
 
-    return f"[{cclass}]", pos
 
+# Wildcards and character classes. Unterminated or empty classes are literal.
+GLOB_TOKEN = re.compile(r"\*|\?|\[(?:!?\][^\]]*|!?[^\]!][^\]]*)\]")
 
-def _compile_glob_expression(pattern: str, pos: int) -> tuple[str, int]:
-    character = pattern[pos]
-    pos += 1
 
-    if character == "*":
-        return "[^/]*", pos
+def _translate_glob_token(token: str) -> str:
+    """Translate a wildcard or character class to a regular expression."""
+    if token == "*":
+        return "[^/]*"
 
-    if character == "?":
-        return "[^/]", pos
+    if token == "?":
+        return "[^/]"
 
-    if character == "[":
-        return _compile_glob_character_class(pattern, pos)
+    negate = token.startswith("[!")
+    cclass = token[2:-1] if negate else token[1:-1]
+    cclass = "-".join(re.escape(part) for part in cclass.split("-"))
+    return f"[^{cclass}]" if negate else f"[{cclass}]"
 
-    return re.escape(character), pos
 
+def _translate_glob(pattern: str) -> str:
+    """Translate glob pattern to a regular expression.
 
-def compile_glob(pattern: str) -> re.Pattern[str]:
-    """Translate glob pattern to a regular expression."""
-    # https://stackoverflow.com/a/29820981/1355754
+    Unlike with fnmatch, wildcards do not match slashes, so `src/*` matches
+    only the entries directly inside `src`.
+    """
 
     def _() -> Iterator[str]:
-        pos, length = 0, len(pattern)
+        pos = 0
+        for match in GLOB_TOKEN.finditer(pattern):
+            yield re.escape(pattern[pos : match.start()])
+            yield _translate_glob_token(match.group())
+            pos = match.end()
 
-        while pos < length:
-            expression, pos = _compile_glob_expression(pattern, pos)
-            yield expression
+        yield re.escape(pattern[pos:])
+        yield r"\Z"
 
-        yield r"\Z(?ms)"
+    return "".join(_())
 
-    return re.compile("".join(_()))
+
+def compile_glob(pattern: str) -> LiteralPattern | GlobPattern:
+    """Compile glob pattern, avoiding regular expressions where possible."""
+    index = next(
+        (index for index, char in enumerate(pattern) if char in GLOB_CHARACTERS),
+        None,
+    )
+    if index is None:
+        # Allow directories to be given with a trailing slash, as in `src/`.
+        return LiteralPattern(pattern.rstrip("/"))
+
+    # Reject most paths by their literal prefix before invoking the regex.
+    return GlobPattern(pattern[:index], re.compile(_translate_glob(pattern)))
+
+
+def compile_globs(patterns: Iterable[str]) -> re.Pattern[str]:
+    """Translate glob patterns to a single regular expression matching any."""
+    expressions = (f"(?:{_translate_glob(pattern)})" for pattern in patterns)
+    return re.compile("|".join(expressions))
 
 
 def query(pathspecs: Iterable[str], *, top: int | None) -> None:
     """Query contributions."""
-    with getcache().open() as io:
-        contributions: dict[str, dict[str, int]] = json.load(io)
+    import rich.console
+    import rich.table
 
-    patterns = [compile_glob(pathspec) for pathspec in pathspecs]
-    if not patterns:
-        patterns = [re.compile("^$")]
+    contributions: dict[str, dict[str, int]] = _read_json(getcontributions())
+
+    # The empty pathspec matches the top-level directory.
+    pathspecs = list(pathspecs) or [""]
 
+    patterns = [compile_glob(pathspec) for pathspec in pathspecs]
+    globs = [
+        pathspec
+        for pathspec, pattern in zip(pathspecs, patterns)
+        if isinstance(pattern, GlobPattern)
+    ]
+
+    # Look up literal pathspecs directly. Scan all paths once for any of the
+    # glob pathspecs, if there are any. Then bucket the few matches.
+    matches = {
+        pattern.path
+        for pattern in patterns
+        if isinstance(pattern, LiteralPattern) and pattern.path in contributions
+    }
+
+    if globs:
+        union = compile_globs(globs)
+        matches.update(path for path in contributions if union.match(path))
+
+    candidates = sorted(matches)
     console = rich.console.Console()
 
     for pattern in patterns:
-        paths = sorted(path for path in contributions if pattern.match(path))
+        paths = [path for path in candidates if pattern.match(path)]
         author_width = max(
             len(author) for path in paths for author in contributions[path]
         )
@@ -158,13 +680,11 @@ def query(pathspecs: Iterable[str], *, top: int | None) -> None:
             table.add_column("Lines", justify="right", width=lines_width)
             table.add_column("%Lines", justify="right", width=len("100.00%"))
 
-            authors = sorted(
+            authors = heapq.nlargest(
+                top if top is not None else len(blame),
                 (author for author in blame if author != TOTALS),
-                key=lambda author: blame[author],
-                reverse=True,
+                key=blame.__getitem__,
             )
-            if top is not None:
-                authors = authors[:top]
 
             for author in (TOTALS, *authors):
                 lines = blame[author]
@@ -185,6 +705,11 @@ def create_argument_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Invalidate the cache of contributions",
     )
+    parser.add_argument(
+        "--log",
+        action="store_true",
+        help="Recompute contributions from the commit log instead of blaming each file",
+    )
     parser.add_argument(
         "--exclude",
         metavar="pathspec",
@@ -206,12 +731,21 @@ def create_argument_parser() -> argparse.ArgumentParser:
 
 def main() -> None:
     """Main function."""
-    rich.traceback.install(show_locals=True)
+    if os.environ.get("GIT_CULPA_DEBUG"):
+        import rich.traceback
+
+        rich.traceback.install(show_locals=True)
 
     parser = create_argument_parser()
     args = parser.parse_args()
 
-    if args.invalidate or not getcache().exists():
-        dump(exclude=args.exclude)
+    if args.invalidate:
+        shutil.rmtree(getcache() / "blobs", ignore_errors=True)
+
+    if args.invalidate or args.log or not getcontributions().exists():
+        if args.log:
+            dump_via_log(exclude=args.exclude)
+        else:
+            dump(exclude=args.exclude)
 
     query(args.pathspecs, top=args.top)
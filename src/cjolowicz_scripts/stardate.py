@@ -5,17 +5,20 @@ import argparse
 import contextlib
 import datetime
 import hashlib
+import importlib.util
 import json
 import os
+import sys
 import time
-from collections import Counter
 from collections.abc import Iterable
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import httpx
+import numpy as np
 import platformdirs
 from matplotlib import pyplot
 from rich import print
@@ -23,8 +26,17 @@ from rich.console import Console
 from rich.progress import Progress
 from rich.table import Table
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+else:
+    HAS_ORJSON = True
 
 Results = list[dict[str, Any]]
+RATE_LIMITED = {httpx.codes.FORBIDDEN, httpx.codes.TOO_MANY_REQUESTS}
+MAX_RETRIES = 5
+MIN_RETRY_DELAY = 1.0
 
 
 @dataclass
@@ -47,27 +59,29 @@ def save_page_to_cache(page: Page) -> None:
         "results": page.results,
     }
 
-    digest = hashlib.blake2b(page.url.encode()).hexdigest()
+    digest = hashlib.blake2b(page.url.encode(), digest_size=16).hexdigest()
     cachedir = Path(platformdirs.user_cache_dir("stardate"))
     cache = cachedir / digest
 
     cachedir.mkdir(parents=True, exist_ok=True)
-    with cache.open(mode="w") as io:
-        json.dump(data, io)
+    if HAS_ORJSON:
+        cache.write_bytes(orjson.dumps(data))
+    else:
+        cache.write_text(json.dumps(data))
 
 
 def load_page_from_cache(url: str) -> Page | None:
     """Load results from the cache."""
-    digest = hashlib.blake2b(url.encode()).hexdigest()
+    digest = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
     cachedir = Path(platformdirs.user_cache_dir("stardate"))
     cache = cachedir / digest
 
     if not cache.is_file():
         return None
 
-    with cache.open() as io:
-        data = json.load(io)
-        return Page(data["url"], data["link"], data["etag"], data["results"], True)
+    contents = cache.read_bytes()
+    data = orjson.loads(contents) if HAS_ORJSON else json.loads(contents)
+    return Page(data["url"], data["link"], data["etag"], data["results"], True)
 
 
 def parse_link_header(response: httpx.Response) -> dict[str, str]:
@@ -84,31 +98,68 @@ def parse_link_header(response: httpx.Response) -> dict[str, str]:
     return dict(_())
 
 
+if sys.version_info >= (3, 11):
+    parse_timestamp = datetime.datetime.fromisoformat
+else:  # pragma: no cover
+    try:
+        from ciso8601 import parse_datetime as parse_timestamp
+    except ImportError:
+
+        def parse_timestamp(timestamp: str) -> datetime.datetime:
+            """Parse an ISO 8601 timestamp."""
+            return datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
 def parse_starred_at(results: Results) -> list[datetime.datetime]:
     """Parse the response."""
-
-    def _() -> Iterator[datetime.datetime]:
+    if __debug__:
         assert isinstance(results, list), f"got {results = }"  # noqa: S101
         for stargazer in results:
             assert isinstance(stargazer, dict)  # noqa: S101
-            starred_at = stargazer["starred_at"]
-            assert isinstance(starred_at, str)  # noqa: S101
-            yield datetime.datetime.fromisoformat(starred_at.replace("Z", "+00:00"))
+            assert isinstance(stargazer["starred_at"], str)  # noqa: S101
 
-    return list(_())
+    return [parse_timestamp(stargazer["starred_at"]) for stargazer in results]
 
 
-def request_stargazers(url: str, *, token: str, etag: str | None) -> httpx.Response:
-    """Retrieve stargazers from the API."""
+def create_client(token: str) -> httpx.Client:
+    """Create a client for the GitHub API."""
     headers = {
         "Accept": "application/vnd.github.v3.star+json",
         "Authorization": f"token {token}",
     }
+    http2 = importlib.util.find_spec("h2") is not None
+    return httpx.Client(headers=headers, http2=http2, timeout=30.0)
+
+
+def get_rate_limit_delay(response: httpx.Response) -> float | None:
+    """Return the seconds to wait before the next request, if rate limited."""
+    if retry_after := response.headers.get("Retry-After"):
+        return float(retry_after)
+
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset = int(response.headers.get("X-RateLimit-Reset", "0"))
+        return max(0.0, reset - time.time())
+
+    return None
 
-    if etag:
-        headers |= {"If-None-Match": etag}
 
-    response = httpx.get(url, headers=headers, params={"per_page": 100})
+def request_stargazers(
+    client: httpx.Client, url: str, *, etag: str | None
+) -> httpx.Response:
+    """Retrieve stargazers from the API.
+
+    Rate-limited requests are retried a few times, waiting at least a second,
+    because the reset time may already have passed.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    response = client.get(url, headers=headers)
+
+    for _ in range(MAX_RETRIES):
+        delay = get_rate_limit_delay(response)
+        if response.status_code not in RATE_LIMITED or delay is None:
+            break
+        time.sleep(max(delay, MIN_RETRY_DELAY))
+        response = client.get(url, headers=headers)
 
     if response.status_code != httpx.codes.NOT_MODIFIED:
         response.raise_for_status()
@@ -116,7 +167,7 @@ def request_stargazers(url: str, *, token: str, etag: str | None) -> httpx.Respo
     return response
 
 
-def get_stargazers_page(url: str, *, token: str, cache: bool = False) -> Page:
+def get_stargazers_page(client: httpx.Client, url: str, *, cache: bool = False) -> Page:
     """Retrieve stargazers from the cache or the API."""
     page = load_page_from_cache(url)
     etag = page.etag if page else None
@@ -124,7 +175,7 @@ def get_stargazers_page(url: str, *, token: str, cache: bool = False) -> Page:
     if cache and page:
         return page
 
-    response = request_stargazers(url, token=token, etag=etag)
+    response = request_stargazers(client, url, etag=etag)
 
     if response.status_code == httpx.codes.NOT_MODIFIED:
         assert page is not None  # noqa: S101
@@ -155,49 +206,78 @@ def parse_page_parameter(url: str) -> int:
     return int(variables.get("page", "0"))
 
 
+def get_page_urls(page: Page) -> list[str]:
+    """Return the URLs of the pages following the first page."""
+    if not (last := page.link.get("last")):
+        return []
+
+    url = httpx.URL(last)
+    total = parse_page_parameter(last)
+    return [str(url.copy_set_param("page", number)) for number in range(2, total + 1)]
+
+
 def get_star_dates(
-    repository: str, *, token: str, console: Console, cache: bool = False
+    repository: str, *, client: httpx.Client, console: Console, cache: bool = False
 ) -> Iterator[datetime.datetime]:
-    """Retrieve the star dates for a repository."""
+    """Retrieve the star dates for a repository.
+
+    The first page reveals the number of pages, which are then retrieved
+    concurrently, and yielded in order.
+    """
     with Progress(console=console, transient=True) as progress:
         task = progress.add_task("Downloading stargazers…")
         page = get_stargazers_page(
-            f"https://api.github.com/repos/{repository}/stargazers",
-            token=token,
+            client,
+            f"https://api.github.com/repos/{repository}/stargazers?per_page=100",
             cache=cache,
         )
 
         yield from parse_starred_at(page.results)
 
-        while url := page.link.get("next"):
-            if last := page.link.get("last"):
-                current = parse_page_parameter(url)
-                total = parse_page_parameter(last)
-                progress.update(task, total=total, completed=current)
-
-            if not page.cached:
-                time.sleep(1)
-
-            page = get_stargazers_page(url, token=token, cache=cache)
-
-            yield from parse_starred_at(page.results)
-
-
-def truncate(
-    now: datetime.datetime, instant: datetime.datetime, interval: datetime.timedelta
-) -> datetime.datetime:
-    """Truncate an instant to the nearest interval."""
-    delta = now - instant
-    delta = interval * (delta // interval)
-    return now - delta
+        urls = get_page_urls(page)
+        progress.update(task, total=len(urls) + 1, completed=1)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(get_stargazers_page, client, url, cache=cache)
+                for url in urls
+            ]
+            try:
+                for future in futures:
+                    page = future.result()
+                    progress.advance(task)
+                    yield from parse_starred_at(page.results)
+            except BaseException:
+                # Fail fast instead of waiting for the queued pages to download.
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
 
 
 def aggregate_star_dates(
     dates: Iterable[datetime.datetime], interval: datetime.timedelta
 ) -> dict[datetime.datetime, int]:
-    """Aggregate the star dates for a repository."""
+    """Aggregate the star dates for a repository.
+
+    Each date is truncated to the nearest interval, counting back from now.
+    """
     now = datetime.datetime.now(datetime.timezone.utc)
-    return Counter(sorted(truncate(now, date, interval) for date in dates))
+    microsecond = datetime.timedelta(microseconds=1)
+    epoch = datetime.datetime.fromtimestamp(0, datetime.timezone.utc)
+
+    # Work with integer microseconds, as datetime64 does not support time zones.
+    # Star dates have whole seconds, so their timestamps convert exactly.
+    timestamps = np.fromiter((date.timestamp() for date in dates), dtype=np.float64)
+    instants = np.rint(timestamps * 1_000_000).astype(np.int64)
+    deltas = (now - epoch) // microsecond - instants
+    intervals, counts = np.unique(
+        deltas // (interval // microsecond), return_counts=True
+    )
+
+    # Fewer intervals back from now means a later date.
+    return {
+        now - interval * int(index): int(count)
+        for index, count in zip(intervals[::-1], counts[::-1])
+    }
 
 
 def plot_star_dates(
@@ -238,30 +318,27 @@ def print_star_dates(
     console.print(table)
 
 
-def parse_interval(interval: str) -> datetime.timedelta:
-    """Parse a time interval."""
-    if interval in ["Y", "year"]:
-        return datetime.timedelta(days=365)
-
-    if interval in ["m", "month"]:
-        return datetime.timedelta(days=31)
-
-    if interval in ["w", "week"]:
-        return datetime.timedelta(weeks=1)
-
-    if interval in ["d", "day"]:
-        return datetime.timedelta(days=1)
-
-    if interval in ["H", "hour"]:
-        return datetime.timedelta(hours=1)
+INTERVALS = {
+    "Y": datetime.timedelta(days=365),
+    "year": datetime.timedelta(days=365),
+    "m": datetime.timedelta(days=31),
+    "month": datetime.timedelta(days=31),
+    "w": datetime.timedelta(weeks=1),
+    "week": datetime.timedelta(weeks=1),
+    "d": datetime.timedelta(days=1),
+    "day": datetime.timedelta(days=1),
+    "H": datetime.timedelta(hours=1),
+    "hour": datetime.timedelta(hours=1),
+    "M": datetime.timedelta(minutes=1),
+    "minute": datetime.timedelta(minutes=1),
+    "S": datetime.timedelta(seconds=1),
+    "second": datetime.timedelta(seconds=1),
+}
 
-    if interval in ["M", "minute"]:
-        return datetime.timedelta(minutes=1)
 
-    if interval in ["S", "second"]:
-        return datetime.timedelta(seconds=1)
-
-    return datetime.timedelta(days=1)
+def parse_interval(interval: str) -> datetime.timedelta:
+    """Parse a time interval."""
+    return INTERVALS.get(interval, datetime.timedelta(days=1))
 
 
 def create_argument_parser() -> argparse.ArgumentParser:
@@ -312,10 +389,12 @@ def main() -> None:
         raise Exception("use --token or GITHUB_TOKEN to specify the API token")
 
     console = Console()
-    dates = get_star_dates(
-        args.repository, token=token, console=console, cache=args.cache
-    )
-    counter = aggregate_star_dates(dates, interval=interval)
+
+    with create_client(token) as client:
+        dates = get_star_dates(
+            args.repository, client=client, console=console, cache=args.cache
+        )
+        counter = aggregate_star_dates(dates, interval=interval)
 
     if args.plot:
         plot_star_dates(counter, args.repository, interval=interval)
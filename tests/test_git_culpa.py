@@ -0,0 +1,418 @@
+"""Test cases for the git_culpa module."""
+import json
+import os
+import shutil
+import subprocess  # noqa: S404
+from pathlib import Path
+
+import pytest
+
+from cjolowicz_scripts import git_culpa
+from cjolowicz_scripts.git_culpa import _apply_hunks
+from cjolowicz_scripts.git_culpa import _parse_blame_incremental
+from cjolowicz_scripts.git_culpa import _parse_hunk_header
+from cjolowicz_scripts.git_culpa import _parse_log
+from cjolowicz_scripts.git_culpa import _replay_changes
+from cjolowicz_scripts.git_culpa import compile_glob
+from cjolowicz_scripts.git_culpa import compile_globs
+from cjolowicz_scripts.git_culpa import dump
+from cjolowicz_scripts.git_culpa import dump_via_log
+from cjolowicz_scripts.git_culpa import getcache
+from cjolowicz_scripts.git_culpa import getcontributions
+
+
+# Output of `git log --reverse --first-parent -m -M --patch --unified=0`:
+# Alice adds a.txt without a trailing newline, and a binary file. Bob appends
+# to a.txt. Carol renames it to b.txt and appends. Erin merges s.txt from a
+# side branch. Frank removes the binary file.
+LOG = """\
+\x00\x00Alice
+
+diff --git a/a.txt b/a.txt
+new file mode 100644
+index 0000000..0a207c0
+--- /dev/null
++++ b/a.txt
+@@ -0,0 +1,2 @@
++a
++b
+\\ No newline at end of file
+diff --git a/bin.dat b/bin.dat
+new file mode 100644
+index 0000000..bdc955b
+Binary files /dev/null and b/bin.dat differ
+\x004b2aa5abec1515a597e87368d74d2bfc38f77adb\x00Bob
+
+diff --git a/a.txt b/a.txt
+index 0a207c0..de98044 100644
+--- a/a.txt
++++ b/a.txt
+@@ -2 +2,2 @@ a
+-b
+\\ No newline at end of file
++b
++c
+\x0040c7785d0279ba82e9026cac1675d4276e608c78\x00Carol
+
+diff --git a/a.txt b/b.txt
+similarity index 75%
+rename from a.txt
+rename to b.txt
+index de98044..d68dd40 100644
+--- a/a.txt
++++ b/b.txt
+@@ -3,0 +4 @@ c
++d
+\x0026283d95c11bc73259328bc620e7844b1fc5c659 9ac1cd38c9cf86b55e42ed87ce9fb389aabb6013\x00Erin
+
+diff --git a/s.txt b/s.txt
+new file mode 100644
+index 0000000..587be6b
+--- /dev/null
++++ b/s.txt
+@@ -0,0 +1 @@
++x
+\x00b6b57dcaa656b01889ffa611ac50b4d7ba2d3e4d\x00Frank
+
+diff --git a/bin.dat b/bin.dat
+deleted file mode 100644
+index bdc955b..0000000
+Binary files a/bin.dat and /dev/null differ
+"""
+
+
+def replay(log: str) -> tuple[dict[str, list[str]], set[str]]:
+    """Replay the log, returning the authors of each file and dirty files."""
+    files: dict[str, list[str]] = {}
+    dirty: set[str] = set()
+    _replay_changes(_parse_log(log.split("\n")), files, dirty)
+    return files, dirty
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("@@ -0,0 +1,2 @@", (0, 0, 2)),
+        ("@@ -2 +2,2 @@ a", (2, 1, 2)),
+        ("@@ -3,0 +4 @@ c", (3, 0, 1)),
+        ("@@ -5,2 +4,0 @@", (5, 2, 0)),
+    ],
+)
+def test_parse_hunk_header(header: str, expected: tuple[int, int, int]) -> None:
+    """It defaults omitted line counts to one."""
+    assert _parse_hunk_header(header) == expected
+
+
+def test_apply_hunks_insertion() -> None:
+    """It inserts lines after the line given in the hunk header."""
+    assert _apply_hunks(["a", "a"], [(1, 0, 2)], "b") == ["a", "b", "b", "a"]
+
+
+def test_apply_hunks_insertion_at_start() -> None:
+    """It inserts lines before the first line."""
+    assert _apply_hunks(["a"], [(0, 0, 1)], "b") == ["b", "a"]
+
+
+def test_apply_hunks_deletion() -> None:
+    """It removes the lines given in the hunk header."""
+    assert _apply_hunks(["a", "b", "c"], [(2, 1, 0)], "d") == ["a", "c"]
+
+
+def test_apply_hunks_multiple() -> None:
+    """It applies hunks relative to the old file."""
+    lines = ["a", "a", "a", "a"]
+    hunks = [(1, 1, 2), (3, 0, 1), (4, 1, 0)]
+    assert _apply_hunks(lines, hunks, "b") == ["b", "b", "a", "a", "b"]
+
+
+def test_parse_log_authors() -> None:
+    """It attributes each change to the author of its commit."""
+    authors = [change.author for change in _parse_log(LOG.split("\n"))]
+    assert authors == ["Alice", "Alice", "Bob", "Carol", "Erin", "Frank"]
+
+
+def test_parse_log_no_newline_at_end_of_file() -> None:
+    """It ignores the marker for a missing newline at the end of the file."""
+    changes = list(_parse_log(LOG.split("\n")))
+    assert changes[0].hunks == [(0, 0, 2)]
+    assert changes[2].hunks == [(2, 1, 2)]
+
+
+def test_parse_log_rename() -> None:
+    """It parses the old and new paths of a renamed file."""
+    change = list(_parse_log(LOG.split("\n")))[3]
+    assert (change.old, change.new, change.hunks) == ("a.txt", "b.txt", [(3, 0, 1)])
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("+++ b/foo bar.txt\t", "foo bar.txt"),
+        ('+++ "b/caf\\303\\251.txt"', '"caf\\303\\251.txt"'),
+    ],
+)
+def test_parse_log_special_path(header: str, expected: str) -> None:
+    """It parses paths with spaces and quoted paths like git ls-files."""
+    log = ["\0\0Alice", "", "diff --git a/x b/x", "--- /dev/null", header]
+    [change] = _parse_log(log)
+    assert change.new == expected
+
+
+def test_parse_log_binary() -> None:
+    """It parses binary files from the diff header."""
+    change = list(_parse_log(LOG.split("\n")))[1]
+    assert (change.old, change.new, change.binary) == (None, "bin.dat", True)
+
+
+def test_replay_changes() -> None:
+    """It reconstructs the author of each surviving line."""
+    files, _ = replay(LOG)
+    assert files == {
+        "b.txt": ["Alice", "Bob", "Bob", "Carol"],
+        "s.txt": ["Erin"],
+    }
+
+
+def test_replay_changes_merge_is_dirty() -> None:
+    """It marks files changed by a merge as dirty."""
+    _, dirty = replay(LOG)
+    assert dirty == {"s.txt"}
+
+
+def test_replay_changes_binary_is_dirty() -> None:
+    """It marks binary files as dirty, until they are deleted."""
+    files, dirty = replay(LOG.partition("\x004b2aa5a")[0])
+    assert files["bin.dat"] == []
+    assert dirty == {"bin.dat"}
+
+
+def test_replay_changes_rename_keeps_dirty() -> None:
+    """It moves the dirty mark of a renamed file to its new path."""
+    log = """\
+\x00p1 p2\x00Erin
+
+diff --git a/a.txt b/a.txt
+new file mode 100644
+--- /dev/null
++++ b/a.txt
+@@ -0,0 +1 @@
++x
+\x00p3\x00Carol
+
+diff --git a/a.txt b/b.txt
+similarity index 100%
+rename from a.txt
+rename to b.txt
+"""
+    assert replay(log) == ({"b.txt": ["Erin"]}, {"b.txt"})
+
+
+def test_replay_changes_unknown_rename_is_dirty() -> None:
+    """It marks files renamed from an unknown path as dirty."""
+    log = """\
+\x00p1\x00Carol
+
+diff --git a/a.txt b/b.txt
+similarity index 100%
+rename from a.txt
+rename to b.txt
+"""
+    assert replay(log) == ({"b.txt": []}, {"b.txt"})
+
+
+# Output of `git blame --incremental`, where Bob's commit appears in two
+# groups, and the last author name is not valid UTF-8.
+BLAME = b"""\
+26283d95c11bc73259328bc620e7844b1fc5c659 4 4 1
+author Carol
+author-mail <carol@example.com>
+author-time 1792045895
+author-tz +0000
+committer Carol
+committer-mail <carol@example.com>
+committer-time 1792045895
+committer-tz +0000
+summary author Mallory
+previous 40c7785d0279ba82e9026cac1675d4276e608c78 a.txt
+filename b.txt
+40c7785d0279ba82e9026cac1675d4276e608c78 2 2 2
+author Bob
+author-mail <bob@example.com>
+author-time 1792045895
+author-tz +0000
+committer Bob
+committer-mail <bob@example.com>
+committer-time 1792045895
+committer-tz +0000
+summary two
+previous 4b2aa5abec1515a597e87368d74d2bfc38f77adb a.txt
+filename a.txt
+40c7785d0279ba82e9026cac1675d4276e608c78 5 5 1
+previous 4b2aa5abec1515a597e87368d74d2bfc38f77adb a.txt
+filename a.txt
+4b2aa5abec1515a597e87368d74d2bfc38f77adb 1 1 1
+author J\xe9r\xf4me
+author-mail <jerome@example.com>
+author-time 1792045895
+author-tz +0000
+committer c
+committer-mail <c@x>
+committer-time 1792045895
+committer-tz +0000
+summary one
+boundary
+filename a.txt
+"""
+
+
+def test_parse_blame_incremental() -> None:
+    """It yields the author of every line in each group."""
+    authors = list(_parse_blame_incremental(BLAME.splitlines(keepends=True)))
+    assert authors == ["Carol", "Bob", "Bob", "Bob", "J\ufffdr\ufffdme"]
+
+
+@pytest.mark.parametrize(
+    "pattern, path, expected",
+    [
+        ("src", "src", True),
+        ("src/", "src", True),
+        ("src", "src/main.py", False),
+        ("src/*", "src/main.py", True),
+        ("src/*", "src/pkg/main.py", False),
+        ("src/*/main.py", "src/pkg/main.py", True),
+        ("src/ma?n.py", "src/main.py", True),
+        ("src/ma?n.py", "src/ma/n.py", False),
+        ("src/[lm]ain.py", "src/main.py", True),
+        ("src/[!lm]ain.py", "src/main.py", False),
+        ("src/[a-z]ain.py", "src/main.py", True),
+        ("src/[]]ain.py", "src/]ain.py", True),
+        ("src/[ain.py", "src/[ain.py", True),
+        ("src/[!]ain.py", "src/[!]ain.py", True),
+        ("*.py", "main.py", True),
+        ("*.py", "src/main.py", False),
+    ],
+)
+def test_compile_glob(pattern: str, path: str, expected: bool) -> None:
+    """It matches paths, without wildcards crossing directories."""
+    assert compile_glob(pattern).match(path) is expected
+
+
+def test_compile_globs() -> None:
+    """It matches paths matching any of the patterns."""
+    pattern = compile_globs(["src/*", "docs/*.rst"])
+    paths = ["src/main.py", "src/pkg/main.py", "docs/index.rst", "README.rst"]
+    assert [path for path in paths if pattern.match(path)] == [
+        "src/main.py",
+        "docs/index.rst",
+    ]
+
+
+def git(*args: str, author: str = "Alice") -> None:
+    """Run git as the given author."""
+    env = os.environ | {
+        "GIT_AUTHOR_NAME": author,
+        "GIT_AUTHOR_EMAIL": f"{author.lower()}@example.com",
+        "GIT_COMMITTER_NAME": author,
+        "GIT_COMMITTER_EMAIL": f"{author.lower()}@example.com",
+    }
+    subprocess.run(["git", *args], check=True, env=env)  # noqa: S603, S607
+
+
+def test_dump_revert(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It blames a reverted file again, although its blob is cached."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "--quiet")
+    Path("a.txt").write_text("a\n")
+    git("add", "a.txt")
+    git("commit", "--quiet", "--message=Add a.txt")
+    Path("a.txt").write_text("b\n")
+    git("commit", "--quiet", "--all", "--message=Change a.txt", author="Bob")
+    git("revert", "--quiet", "--no-edit", "HEAD", author="Carol")
+
+    git("checkout", "--quiet", "HEAD~2")
+    dump(exclude=None)
+    git("checkout", "--quiet", "-")
+    dump(exclude=None)
+
+    contributions = json.loads(getcontributions().read_text())
+    assert contributions["a.txt"] == {"Carol": 1, "null": 1}
+
+
+def test_dump_dirty_subdirectory(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """It does not cache the blame of a modified file in a subdirectory."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "--quiet")
+    Path("src").mkdir()
+    Path("src/a.txt").write_text("a\nb\n")
+    git("add", "src/a.txt")
+    git("commit", "--quiet", "--message=Add a.txt")
+
+    monkeypatch.chdir(tmp_path / "src")
+    Path("a.txt").write_text("a\nb\nc\n")
+    dump(exclude=None)
+    Path("a.txt").write_text("a\nb\n")
+    dump(exclude=None)
+
+    contributions = json.loads(getcontributions().read_text())
+    assert contributions["a.txt"] == {"Alice": 2, "null": 2}
+
+
+def test_dump_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It does not blame files again if their history is unchanged."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "--quiet", "--initial-branch=main")
+    Path("a.txt").write_text("a\n")
+    Path("b.txt").write_text("")
+    Path("c.txt").write_text("")
+    git("add", ".")
+    git("commit", "--quiet", "--message=Add files")
+    git("checkout", "--quiet", "-b", "topic")
+    Path("b.txt").write_text("b\n")
+    git("commit", "--quiet", "--all", "--message=Change b.txt", author="Bob")
+    git("checkout", "--quiet", "main")
+    Path("a.txt").write_text("a\nc\n")
+    git("commit", "--quiet", "--all", "--message=Change a.txt", author="Carol")
+    git("merge", "--quiet", "--no-edit", "topic", author="Carol")
+    dump(exclude=None)
+
+    def blame(filename: str) -> dict[str, int]:
+        raise AssertionError(filename)
+
+    monkeypatch.setattr(git_culpa, "_blame", blame)
+    getcontributions().unlink()
+    dump(exclude=None)
+
+    contributions = json.loads(getcontributions().read_text())
+    assert contributions[""] == {"Alice": 1, "Bob": 1, "Carol": 1, "null": 3}
+
+
+def test_dump_via_log(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It computes the same contributions as blaming each file."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "--quiet", "--initial-branch=main")
+    Path("foo bar.txt").write_text("a\nb\nc\n")
+    Path("a.txt").write_text("a\nb\n")
+    git("add", ".")
+    git("commit", "--quiet", "--message=Add files")
+    git("mv", "foo bar.txt", "baz qux.txt")
+    git("commit", "--quiet", "--message=Rename foo bar.txt", author="Bob")
+    git("checkout", "--quiet", "-b", "topic")
+    Path("a.txt").write_text("a\nx\nb\n")
+    Path("s.txt").write_text("s\n")
+    git("add", ".")
+    git("commit", "--quiet", "--message=Change a.txt", author="Carol")
+    git("checkout", "--quiet", "main")
+    Path("baz qux.txt").write_text("a\nb\nc\nd\n")
+    git("commit", "--quiet", "--all", "--message=Append", author="Dan")
+    git("merge", "--quiet", "--no-edit", "topic", author="Erin")
+
+    dump(exclude=None)
+    expected = json.loads(getcontributions().read_text())
+    shutil.rmtree(getcache())
+    dump_via_log(exclude=None)
+    contributions = json.loads(getcontributions().read_text())
+
+    assert contributions == expected
+    assert contributions["baz qux.txt"] == {"Alice": 3, "Dan": 1, "null": 4}
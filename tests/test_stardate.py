@@ -0,0 +1,173 @@
+"""Test cases for the stardate module."""
+import datetime
+import io
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from rich.console import Console
+
+from cjolowicz_scripts.stardate import aggregate_star_dates
+from cjolowicz_scripts.stardate import get_page_urls
+from cjolowicz_scripts.stardate import get_rate_limit_delay
+from cjolowicz_scripts.stardate import get_star_dates
+from cjolowicz_scripts.stardate import MAX_RETRIES
+from cjolowicz_scripts.stardate import MIN_RETRY_DELAY
+from cjolowicz_scripts.stardate import Page
+from cjolowicz_scripts.stardate import request_stargazers
+
+
+UTC = datetime.timezone.utc
+NOW = datetime.datetime(2022, 1, 10, 12, tzinfo=UTC)
+DAY = datetime.timedelta(days=1)
+
+
+class FrozenDateTime(datetime.datetime):
+    """A datetime whose current time is fixed."""
+
+    @classmethod
+    def now(cls, tz: datetime.tzinfo | None = None) -> "FrozenDateTime":
+        """Return the fixed current time."""
+        return cls.fromtimestamp(NOW.timestamp(), tz)
+
+
+@pytest.fixture
+def frozen(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Freeze the current time."""
+    monkeypatch.setattr(datetime, "datetime", FrozenDateTime)
+
+
+@pytest.mark.usefixtures("frozen")
+@pytest.mark.parametrize(
+    "interval, expected",
+    [
+        (
+            DAY,
+            {NOW - 9 * DAY: 1, NOW - DAY: 2, NOW: 2},
+        ),
+        (
+            datetime.timedelta(weeks=1),
+            {NOW - datetime.timedelta(weeks=1): 1, NOW: 4},
+        ),
+        (
+            datetime.timedelta(hours=1),
+            {
+                NOW - 216 * datetime.timedelta(hours=1): 1,
+                NOW - 25 * datetime.timedelta(hours=1): 1,
+                NOW - 24 * datetime.timedelta(hours=1): 1,
+                NOW - 23 * datetime.timedelta(hours=1): 1,
+                NOW - datetime.timedelta(hours=1): 1,
+            },
+        ),
+    ],
+)
+def test_aggregate_star_dates(
+    interval: datetime.timedelta, expected: dict[datetime.datetime, int]
+) -> None:
+    """It counts the dates per interval back from now, in chronological order."""
+    dates = [
+        datetime.datetime(2022, 1, 1, 12, tzinfo=UTC),
+        datetime.datetime(2022, 1, 9, 11, tzinfo=UTC),
+        datetime.datetime(2022, 1, 9, 11, 30, 15, tzinfo=UTC),
+        datetime.datetime(2022, 1, 9, 13, tzinfo=UTC),
+        datetime.datetime(2022, 1, 10, 11, tzinfo=UTC),
+    ]
+    counts = aggregate_star_dates(dates, interval)
+    assert list(counts.items()) == list(expected.items())
+
+
+@pytest.mark.usefixtures("frozen")
+def test_aggregate_star_dates_empty() -> None:
+    """It returns no intervals if there are no dates."""
+    assert aggregate_star_dates([], DAY) == {}
+
+
+URL = "https://api.github.com/repos/owner/name/stargazers?per_page=100"
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Record the delays instead of sleeping."""
+    delays: list[float] = []
+    monkeypatch.setattr(time, "sleep", delays.append)
+    return delays
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Retry-After": "3"}, 3.0),
+        ({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}, 0.0),
+        ({"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "0"}, None),
+        ({}, None),
+    ],
+)
+def test_get_rate_limit_delay(headers: dict[str, str], expected: float | None) -> None:
+    """It returns the delay from the headers, if rate limited."""
+    response = httpx.Response(httpx.codes.FORBIDDEN, headers=headers)
+    assert get_rate_limit_delay(response) == expected
+
+
+def test_request_stargazers_max_retries(sleeps: list[float]) -> None:
+    """It gives up after a few retries, waiting at least a second each time."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}
+        return httpx.Response(httpx.codes.FORBIDDEN, headers=headers)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    with pytest.raises(httpx.HTTPStatusError):
+        request_stargazers(client, URL, etag=None)
+
+    assert len(requests) == MAX_RETRIES + 1
+    assert sleeps == [MIN_RETRY_DELAY] * MAX_RETRIES
+
+
+def test_request_stargazers_retry_after(sleeps: list[float]) -> None:
+    """It retries after the delay given by the Retry-After header."""
+    responses = [
+        httpx.Response(httpx.codes.TOO_MANY_REQUESTS, headers={"Retry-After": "2"}),
+        httpx.Response(httpx.codes.OK, json=[]),
+    ]
+    client = httpx.Client(
+        transport=httpx.MockTransport(lambda request: responses.pop(0))
+    )
+    response = request_stargazers(client, URL, etag=None)
+    assert response.status_code == httpx.codes.OK
+    assert sleeps == [2.0]
+
+
+def test_get_page_urls() -> None:
+    """It returns the URLs of the second to the last page."""
+    page = Page(URL, {"last": f"{URL}&page=3"}, "", [], False)
+    assert get_page_urls(page) == [f"{URL}&page=2", f"{URL}&page=3"]
+
+
+def test_get_page_urls_single_page() -> None:
+    """It returns no URLs if there is only one page."""
+    page = Page(URL, {}, "", [], False)
+    assert get_page_urls(page) == []
+
+
+def test_get_star_dates(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It yields the star dates in page order, although pages finish out of order."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    pages = 5
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        number = int(request.url.params.get("page", "1"))
+        # Delay earlier pages, so that later pages finish first.
+        time.sleep((pages - number) / 100)
+        link = f'<{URL}&page={pages}>; rel="last"'
+        results = [{"starred_at": f"2022-01-{number:02}T00:00:00Z"}]
+        headers = {"ETag": str(number), "Link": link}
+        return httpx.Response(httpx.codes.OK, headers=headers, json=results)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    console = Console(file=io.StringIO())
+    dates = get_star_dates("owner/name", client=client, console=console)
+
+    assert [date.day for date in dates] == list(range(1, pages + 1))